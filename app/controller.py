@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import bisect
 import re
 from pathlib import Path
 
@@ -8,15 +9,18 @@ from PySide6.QtGui import QAction, QTextCursor
 from PySide6.QtWidgets import QFileDialog, QInputDialog, QMenu, QMessageBox, QProgressDialog, QTreeWidgetItem
 
 from app.core.chapter_parser import (
+    CompiledRuleSet,
     check_line_for_toc,
     compile_rule_levels,
     default_rule_levels,
     parse_toc_items,
     recompute_ranges,
+    recompute_ranges_after_insert,
+    validate_rule_line,
 )
 from app.core.epub_builder import build_epub
 from app.core.models import RuleLevel, TocItem
-from app.core.txt_loader import load_txt_lines
+from app.core.txt_loader import iter_txt_line_blocks
 from app.core.utils import normalize_title
 from app.metadata_dialog import MetadataDialog
 from app.ui_mainwindow import AppState, MainWindow
@@ -24,6 +28,7 @@ from app.ui_mainwindow import AppState, MainWindow
 
 class TxtLoadWorker(QObject):
     progress_updated = Signal(int)
+    chunk_ready = Signal(list)
     load_finished = Signal(list)
     load_failed = Signal(str)
 
@@ -33,24 +38,52 @@ class TxtLoadWorker(QObject):
 
     def run(self) -> None:
         try:
-            lines = load_txt_lines(self.file_path, progress_callback=lambda value: self.progress_updated.emit(value))
+            lines: list[str] = []
+            for block in iter_txt_line_blocks(
+                self.file_path, progress_callback=lambda value: self.progress_updated.emit(value)
+            ):
+                lines.extend(block)
+                self.chunk_ready.emit(block)
             self.load_finished.emit(lines)
         except Exception as exc:  # noqa: BLE001
             self.load_failed.emit(str(exc))
 
 
+class ParseWorker(QObject):
+    parse_finished = Signal(list)
+    parse_failed = Signal(str)
+
+    def __init__(self, lines: list[str], compiled: CompiledRuleSet) -> None:
+        super().__init__()
+        self.lines = lines
+        self.compiled = compiled
+
+    def run(self) -> None:
+        try:
+            items = parse_toc_items(self.lines, compiled_levels=self.compiled)
+            self.parse_finished.emit(items)
+        except Exception as exc:  # noqa: BLE001
+            self.parse_failed.emit(str(exc))
+
+
 class AppController(QObject):
     def __init__(self, window: MainWindow) -> None:
         super().__init__()
         self.window = window
         self.lines: list[str] = []
         self.toc_items: list[TocItem] = []
+        self._toc_nodes: list[QTreeWidgetItem] = []
         self.rule_levels: list[RuleLevel] = default_rule_levels()
         self.current_file_path: str = ""
         self.unsaved_changes = False
+        self._compiled_cache: CompiledRuleSet | None = None
 
         self.load_thread: QThread | None = None
         self.load_worker: TxtLoadWorker | None = None
+        self.parse_thread: QThread | None = None
+        self.parse_worker: ParseWorker | None = None
+        self._parse_sets_unsaved = False
+        self._pending_reparse: bool | None = None
         self._rule_ui_loading = False
 
         self._bind_events()
@@ -118,6 +151,7 @@ class AppController(QObject):
                 rules=[r"^第([0-9一二三四五六七八九十百千万两]+)章[\s:：-]*(.*)$ => 第\1章 \2"],
             )
         )
+        self._compiled_cache = None
         self._load_rule_levels_to_ui()
         self.window.rule_level_list.setCurrentRow(next_no - 1)
         self.unsaved_changes = True
@@ -130,6 +164,7 @@ class AppController(QObject):
         if index < 0 or index >= len(self.rule_levels):
             return
         self.rule_levels.pop(index)
+        self._compiled_cache = None
         self._load_rule_levels_to_ui()
         self.unsaved_changes = True
 
@@ -143,7 +178,9 @@ class AppController(QObject):
             QMessageBox.warning(self.window, "规则为空", "每个级别至少需要一条规则。")
             return False
         try:
-            compile_rule_levels([RuleLevel(name=name, rules=rules)])
+            # 只校验单条规则能否编译，合并规则集等留给 _compiled_rule_levels 按需构建
+            for line in rules:
+                validate_rule_line(line)
         except re.error as exc:
             QMessageBox.critical(self.window, "规则错误", f"正则编译失败：{exc}")
             return False
@@ -151,14 +188,22 @@ class AppController(QObject):
             QMessageBox.critical(self.window, "规则错误", str(exc))
             return False
 
-        self.rule_levels[index] = RuleLevel(name=name, rules=rules)
+        level = RuleLevel(name=name, rules=rules)
+        if level != self.rule_levels[index]:
+            self.rule_levels[index] = level
+            self._compiled_cache = None
+            self.unsaved_changes = True
         self._load_rule_levels_to_ui()
         self.window.rule_level_list.setCurrentRow(index)
-        self.unsaved_changes = True
         if show_message:
             QMessageBox.information(self.window, "已保存", "当前级别规则已保存。")
         return True
 
+    def _compiled_rule_levels(self) -> CompiledRuleSet:
+        if self._compiled_cache is None:
+            self._compiled_cache = compile_rule_levels(self.rule_levels)
+        return self._compiled_cache
+
     def save_current_rule_level(self) -> None:
         self._try_save_current_rule_level(show_message=False)
 
@@ -183,12 +228,14 @@ class AppController(QObject):
         self.window.set_loading_file_name(Path(file_path).name)
         self.window.set_state(AppState.LOADING)
         self._set_editing_controls_enabled(False)
+        self.window.preview_text.clear()
 
         self.load_thread = QThread()
         self.load_worker = TxtLoadWorker(file_path)
         self.load_worker.moveToThread(self.load_thread)
         self.load_thread.started.connect(self.load_worker.run)
         self.load_worker.progress_updated.connect(self.window.progress_bar.setValue)
+        self.load_worker.chunk_ready.connect(self._on_load_chunk)
         self.load_worker.load_finished.connect(self._on_load_finished)
         self.load_worker.load_failed.connect(self._on_load_failed)
         self.load_worker.load_finished.connect(self.load_thread.quit)
@@ -204,41 +251,93 @@ class AppController(QObject):
             self.load_thread.deleteLater()
             self.load_thread = None
 
+    def _on_load_chunk(self, block: list[str]) -> None:
+        self.window.preview_text.appendPlainText("\n".join(block))
+
     def _on_load_finished(self, lines: list[str]) -> None:
         self.lines = lines
         self.unsaved_changes = False
-        self.window.preview_text.setPlainText(self._format_preview_text(lines))
-        self.reparse_toc(set_unsaved=False)
+        self.window.preview_text.moveCursor(QTextCursor.MoveOperation.Start)
         self.window.set_state(AppState.EDITING)
         self._set_editing_controls_enabled(True)
+        self.reparse_toc(set_unsaved=False)
 
     def _on_load_failed(self, message: str) -> None:
         self.window.set_state(AppState.START)
         QMessageBox.critical(self.window, "加载失败", message)
 
-    def _format_preview_text(self, lines: list[str]) -> str:
-        return "\n".join(f"{i + 1:06d} | {line}" for i, line in enumerate(lines))
-
     def reparse_toc(self, set_unsaved: bool = True) -> None:
         if not self._try_save_current_rule_level(show_message=False):
             return
-        self.toc_items = parse_toc_items(self.lines, self.rule_levels)
+        if self.parse_thread is not None:
+            self._pending_reparse = set_unsaved
+            return
+        self._start_parse(set_unsaved)
+
+    def _start_parse(self, set_unsaved: bool) -> None:
+        self._parse_sets_unsaved = set_unsaved
+        self._set_editing_controls_enabled(False)
+
+        self.parse_thread = QThread()
+        self.parse_worker = ParseWorker(self.lines, self._compiled_rule_levels())
+        self.parse_worker.moveToThread(self.parse_thread)
+        self.parse_thread.started.connect(self.parse_worker.run)
+        self.parse_worker.parse_finished.connect(self._on_parse_finished)
+        self.parse_worker.parse_failed.connect(self._on_parse_failed)
+        self.parse_worker.parse_finished.connect(self.parse_thread.quit)
+        self.parse_worker.parse_failed.connect(self.parse_thread.quit)
+        self.parse_thread.finished.connect(self._cleanup_parse_thread)
+        self.parse_thread.start()
+
+    def _cleanup_parse_thread(self) -> None:
+        if self.parse_worker:
+            self.parse_worker.deleteLater()
+            self.parse_worker = None
+        if self.parse_thread:
+            self.parse_thread.deleteLater()
+            self.parse_thread = None
+        if self._pending_reparse is not None:
+            set_unsaved = self._pending_reparse
+            self._pending_reparse = None
+            self._start_parse(set_unsaved)
+
+    def _on_parse_finished(self, items: list[TocItem]) -> None:
+        if self._pending_reparse is not None:
+            return
+        self.toc_items = items
         self._refresh_toc_tree()
-        if set_unsaved:
+        if self._parse_sets_unsaved:
             self.unsaved_changes = True
+        if self.window.state == AppState.EDITING:
+            self._set_editing_controls_enabled(True)
+
+    def _on_parse_failed(self, message: str) -> None:
+        if self._pending_reparse is not None:
+            return
+        if self.window.state == AppState.EDITING:
+            self._set_editing_controls_enabled(True)
+        QMessageBox.critical(self.window, "识别失败", message)
+
+    @staticmethod
+    def _toc_display(item: TocItem) -> str:
+        return f"[L{item.level} {item.level_name}] {item.title}"
+
+    @staticmethod
+    def _toc_range_text(item: TocItem) -> str:
+        return f"{item.start_line + 1}-{item.end_line + 1}"
 
     def _refresh_toc_tree(self) -> None:
         self.window.toc_tree.blockSignals(True)
         self.window.toc_tree.clear()
+        self._toc_nodes = []
         stack: list[tuple[int, QTreeWidgetItem]] = []
 
         for idx, item in enumerate(self.toc_items):
             while stack and stack[-1][0] >= item.level:
                 stack.pop()
             parent = stack[-1][1] if stack else None
-            range_text = f"{item.start_line + 1}-{item.end_line + 1}"
-            display = f"[L{item.level} {item.level_name}] {item.title}"
-            node = self.window.add_toc_item(parent, display, range_text, idx)
+            node = self.window.add_toc_item(parent, self._toc_display(item), self._toc_range_text(item), idx)
+            self._toc_nodes.append(node)
             stack.append((item.level, node))
 
         self.window.toc_tree.blockSignals(False)
@@ -246,6 +345,54 @@ class AppController(QObject):
         if self.window.toc_tree.topLevelItemCount() > 0:
             self.window.toc_tree.setCurrentItem(self.window.toc_tree.topLevelItem(0))
 
+    def _sync_toc_nodes(self) -> None:
+        for idx, (item, node) in enumerate(zip(self.toc_items, self._toc_nodes)):
+            if node.data(0, Qt.ItemDataRole.UserRole) != idx:
+                node.setData(0, Qt.ItemDataRole.UserRole, idx)
+            range_text = self._toc_range_text(item)
+            if node.text(1) != range_text:
+                node.setText(1, range_text)
+
+    def _insert_toc_node(self, idx: int) -> bool:
+        item = self.toc_items[idx]
+        if idx + 1 < len(self.toc_items) and self.toc_items[idx + 1].level > item.level:
+            return False
+        parent_idx = next((j for j in range(idx - 1, -1, -1) if self.toc_items[j].level < item.level), -1)
+        parent = self._toc_nodes[parent_idx] if parent_idx >= 0 else None
+        container = parent if parent is not None else self.window.toc_tree.invisibleRootItem()
+        position = 0
+        for k in range(idx - 1, parent_idx, -1):
+            sibling_pos = container.indexOfChild(self._toc_nodes[k])
+            if sibling_pos >= 0:
+                position = sibling_pos + 1
+                break
+
+        self.window.toc_tree.blockSignals(True)
+        node = self.window.add_toc_item(parent, self._toc_display(item), self._toc_range_text(item), idx, position)
+        self._toc_nodes.insert(idx, node)
+        self._sync_toc_nodes()
+        self.window.toc_tree.blockSignals(False)
+        self.window.toc_tree.setCurrentItem(node)
+        return True
+
+    def _remove_toc_node(self, idx: int) -> bool:
+        node = self._toc_nodes[idx]
+        if node.childCount() > 0:
+            return False
+        parent = node.parent()
+        container = parent if parent is not None else self.window.toc_tree.invisibleRootItem()
+        self.window.toc_tree.blockSignals(True)
+        container.removeChild(node)
+        self._toc_nodes.pop(idx)
+        self._sync_toc_nodes()
+        self.window.toc_tree.blockSignals(False)
+        return True
+
+    def _set_toc_node_title(self, idx: int) -> None:
+        self.window.toc_tree.blockSignals(True)
+        self._toc_nodes[idx].setText(0, self._toc_display(self.toc_items[idx]))
+        self.window.toc_tree.blockSignals(False)
+
     def _selected_flat_index(self) -> int:
         node = self.window.toc_tree.currentItem()
         if node is None:
@@ -281,11 +428,14 @@ class AppController(QObject):
         flat_index = int(idx)
         if flat_index < 0 or flat_index >= len(self.toc_items):
             return
-        text = re.sub(r"^\[L\d+\s+[^\]]+\]\s*", "", node.text(0).strip())
+        text = node.text(0).strip()
+        if text.startswith("[L"):
+            _, sep, rest = text.partition("] ")
+            text = rest if sep else text
         fallback = f"{self.toc_items[flat_index].level_name}{flat_index + 1}"
         self.toc_items[flat_index].title = normalize_title(text, fallback)
         self.unsaved_changes = True
-        self._refresh_toc_tree()
+        self._set_toc_node_title(flat_index)
 
     def highlight_selected_toc_in_preview(self) -> None:
         row = self._selected_flat_index()
@@ -304,8 +454,8 @@ class AppController(QObject):
             return
         if not self._try_save_current_rule_level(show_message=False):
             return
-        compiled = compile_rule_levels(self.rule_levels)
-        if not compiled:
+        compiled = self._compiled_rule_levels()
+        if not compiled.levels:
             self.window.rule_test_result.setText("测试结果：当前规则为空")
             return
 
@@ -341,17 +491,20 @@ class AppController(QObject):
         if not ok:
             return
 
-        self.toc_items.append(
-            TocItem(
-                title=normalize_title(title, default_title),
-                start_line=start_line,
-                end_line=len(self.lines) - 1,
-                level=level_no,
-                level_name=level_name,
-            )
+        new_item = TocItem(
+            title=normalize_title(title, default_title),
+            start_line=start_line,
+            end_line=len(self.lines) - 1,
+            level=level_no,
+            level_name=level_name,
         )
-        self.toc_items = recompute_ranges(self.toc_items, len(self.lines))
-        self._refresh_toc_tree()
+        new_idx = bisect.bisect_right(
+            self.toc_items, (new_item.start_line, new_item.level), key=lambda item: (item.start_line, item.level)
+        )
+        self.toc_items.insert(new_idx, new_item)
+        recompute_ranges_after_insert(self.toc_items, new_idx, len(self.lines))
+        if not self._insert_toc_node(new_idx):
+            self._refresh_toc_tree()
         self.unsaved_changes = True
 
     def delete_selected_toc_item(self) -> None:
@@ -364,7 +517,8 @@ class AppController(QObject):
             return
         self.toc_items.pop(idx)
         self.toc_items = recompute_ranges(self.toc_items, len(self.lines))
-        self._refresh_toc_tree()
+        if not self._remove_toc_node(idx):
+            self._refresh_toc_tree()
         self.unsaved_changes = True
 
     def swap_selected_title(self, direction: int) -> None:
@@ -376,7 +530,9 @@ class AppController(QObject):
             QMessageBox.information(self.window, "提示", "仅支持在相同层级间上移/下移。")
             return
         self.toc_items[idx].title, self.toc_items[target].title = self.toc_items[target].title, self.toc_items[idx].title
-        self._refresh_toc_tree()
+        self._set_toc_node_title(idx)
+        self._set_toc_node_title(target)
+        self.window.toc_tree.setCurrentItem(self._toc_nodes[target])
         self.unsaved_changes = True
 
     def show_toc_context_menu(self, pos) -> None:  # type: ignore[no-untyped-def]
@@ -1,8 +1,16 @@
 from __future__ import annotations
 
+import functools
 import re
-from dataclasses import dataclass
-from typing import Iterable
+from dataclasses import dataclass, field
+from re import _constants as sre_constants
+from re import _parser as sre_parse
+from typing import Any, Callable, Iterable, Iterator
+
+try:
+    import hyperscan
+except ImportError:  # 可选依赖，未安装时使用 re 扫描
+    hyperscan = None
 
 from .models import RuleLevel, TocGroup, TocItem
 from .utils import normalize_title
@@ -13,6 +21,7 @@ class CompiledRule:
     regex: re.Pattern[str]
     replacement: str
     raw_rule: str
+    expand: Callable[[re.Match[str]], str] = field(repr=False, compare=False)
 
 
 @dataclass
@@ -29,6 +38,18 @@ class CompiledLevel:
     level_no: int
     level_name: str
     rules: list[CompiledRule]
+    first_chars: frozenset[str] | None = None
+
+
+@dataclass
+class CompiledRuleSet:
+    levels: list[CompiledLevel]
+    combined: re.Pattern[str] | None
+    dispatch: list[tuple[CompiledLevel, CompiledRule]]
+    first_chars: frozenset[str] | None = None
+    literal_prefixes: tuple[str, ...] = ()
+    scan: re.Pattern[str] | None = None
+    hs_database: Any | None = None
 
 
 @dataclass
@@ -76,13 +97,240 @@ def _normalize_replacement(value: str) -> str:
     return value
 
 
+def _template_expander(regex: re.Pattern[str], replacement: str) -> Callable[[re.Match[str]], str]:
+    parse_template = getattr(sre_parse, "parse_template", None)
+    expand_template = getattr(sre_parse, "expand_template", None)
+    if parse_template is None or expand_template is None:
+        return lambda match: match.expand(replacement)
+    try:
+        template = parse_template(replacement, regex)
+    except IndexError as exc:
+        # 引用不存在的命名分组时抛出 IndexError，统一为 re.error 交给规则校验提示
+        raise re.error(str(exc)) from exc
+    return lambda match: expand_template(template, match)
+
+
+@functools.lru_cache(maxsize=256)
 def _compile_rule(rule_line: str) -> CompiledRule:
     pattern, replacement = _split_rule_line(rule_line)
     regex = re.compile(pattern)
-    return CompiledRule(regex=regex, replacement=_normalize_replacement(replacement), raw_rule=rule_line)
+    replacement = _normalize_replacement(replacement)
+    return CompiledRule(
+        regex=regex,
+        replacement=replacement,
+        raw_rule=rule_line,
+        expand=_template_expander(regex, replacement),
+    )
+
+
+_MAX_RANGE_CHARS = 512
+_MAX_LITERAL_PREFIXES = 64
+
+
+def _item_first_chars(op, av) -> tuple[set[str] | None, bool]:  # type: ignore[no-untyped-def]
+    if op is sre_constants.LITERAL:
+        return {chr(av)}, False
+    if op is sre_constants.IN:
+        chars: set[str] = set()
+        for item_op, item_av in av:
+            if item_op is sre_constants.LITERAL:
+                chars.add(chr(item_av))
+            elif item_op is sre_constants.RANGE and item_av[1] - item_av[0] < _MAX_RANGE_CHARS:
+                chars.update(chr(code) for code in range(item_av[0], item_av[1] + 1))
+            else:
+                return None, False
+        return chars, False
+    if op is sre_constants.SUBPATTERN:
+        _, add_flags, _, sub = av
+        if add_flags & sre_constants.SRE_FLAG_IGNORECASE:
+            return None, False
+        return _seq_first_chars(sub)
+    if op is sre_constants.BRANCH:
+        chars = set()
+        nullable = False
+        for branch in av[1]:
+            branch_chars, branch_nullable = _seq_first_chars(branch)
+            if branch_chars is None:
+                return None, False
+            chars |= branch_chars
+            nullable = nullable or branch_nullable
+        return chars, nullable
+    if op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT):
+        low, _, sub = av
+        sub_chars, sub_nullable = _seq_first_chars(sub)
+        return sub_chars, sub_nullable or low == 0
+    if op in (sre_constants.AT, sre_constants.ASSERT, sre_constants.ASSERT_NOT):
+        return set(), True
+    return None, False
+
+
+def _seq_first_chars(seq) -> tuple[set[str] | None, bool]:  # type: ignore[no-untyped-def]
+    chars: set[str] = set()
+    for op, av in seq:
+        item_chars, nullable = _item_first_chars(op, av)
+        if item_chars is None:
+            return None, False
+        chars |= item_chars
+        if not nullable:
+            return chars, False
+    return chars, True
+
+
+def _rule_first_chars(regex: re.Pattern[str]) -> frozenset[str] | None:
+    try:
+        parsed = sre_parse.parse(regex.pattern, regex.flags)
+    except re.error:
+        return None
+    if parsed.state.flags & sre_constants.SRE_FLAG_IGNORECASE:
+        return None
+    chars, nullable = _seq_first_chars(parsed)
+    if chars is None or nullable:
+        return None
+    return frozenset(chars)
+
+
+def _union_first_chars(groups: Iterable[frozenset[str] | None]) -> frozenset[str] | None:
+    union: set[str] = set()
+    for chars in groups:
+        if chars is None:
+            return None
+        union |= chars
+    return frozenset(union)
+
+
+def _item_prefixes(op, av) -> tuple[set[str] | None, bool]:  # type: ignore[no-untyped-def]
+    if op is sre_constants.LITERAL:
+        return {chr(av)}, True
+    if op is sre_constants.IN:
+        chars: set[str] = set()
+        for item_op, item_av in av:
+            if item_op is sre_constants.LITERAL:
+                chars.add(chr(item_av))
+            elif item_op is sre_constants.RANGE and item_av[1] - item_av[0] < _MAX_LITERAL_PREFIXES:
+                chars.update(chr(code) for code in range(item_av[0], item_av[1] + 1))
+            else:
+                return None, False
+        return chars, True
+    if op is sre_constants.SUBPATTERN:
+        _, add_flags, _, sub = av
+        if add_flags & sre_constants.SRE_FLAG_IGNORECASE:
+            return None, False
+        return _seq_prefixes(sub)
+    if op is sre_constants.BRANCH:
+        prefixes: set[str] = set()
+        exact = True
+        for branch in av[1]:
+            branch_prefixes, branch_exact = _seq_prefixes(branch)
+            prefixes |= branch_prefixes
+            exact = exact and branch_exact
+        return prefixes, exact
+    if op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT) and av[0] >= 1:
+        sub_prefixes, _ = _seq_prefixes(av[2])
+        return sub_prefixes, False
+    return None, False
+
+
+def _seq_prefixes(seq) -> tuple[set[str], bool]:  # type: ignore[no-untyped-def]
+    prefixes = {""}
+    for op, av in seq:
+        if op is sre_constants.AT and av is sre_constants.AT_BEGINNING:
+            continue
+        item_prefixes, exact = _item_prefixes(op, av)
+        if item_prefixes is None or len(prefixes) * len(item_prefixes) > _MAX_LITERAL_PREFIXES:
+            return prefixes, False
+        prefixes = {head + tail for head in prefixes for tail in item_prefixes}
+        if not exact:
+            return prefixes, False
+    return prefixes, True
+
+
+def _rule_literal_prefixes(regex: re.Pattern[str]) -> set[str] | None:
+    try:
+        parsed = sre_parse.parse(regex.pattern, regex.flags)
+    except re.error:
+        return None
+    if parsed.state.flags & sre_constants.SRE_FLAG_IGNORECASE:
+        return None
+    prefixes, _ = _seq_prefixes(parsed)
+    if "" in prefixes:
+        return None
+    return prefixes
+
+
+def _collect_literal_prefixes(rules: Iterable[CompiledRule]) -> tuple[str, ...]:
+    collected: set[str] = set()
+    for rule in rules:
+        prefixes = _rule_literal_prefixes(rule.regex)
+        if prefixes is None:
+            return ()
+        collected |= prefixes
+    return tuple(sorted(collected))
+
+
+def _build_scan_pattern(first_chars: frozenset[str] | None, literal_prefixes: tuple[str, ...]) -> re.Pattern[str] | None:
+    if first_chars:
+        alternatives = "[" + "".join(re.escape(char) for char in sorted(first_chars)) + "]"
+    elif literal_prefixes:
+        alternatives = "|".join(re.escape(prefix) for prefix in literal_prefixes)
+    else:
+        return None
+    return re.compile(rf"^[^\S\n]*(?:{alternatives})", re.MULTILINE)
+
+
+def _build_hs_database(scan: re.Pattern[str] | None) -> Any | None:
+    if hyperscan is None or scan is None:
+        return None
+    database = hyperscan.Database()
+    try:
+        database.compile(
+            expressions=[scan.pattern.encode("utf-8")],
+            ids=[0],
+            elements=1,
+            flags=[hyperscan.HS_FLAG_MULTILINE | hyperscan.HS_FLAG_UTF8 | hyperscan.HS_FLAG_UCP],
+        )
+    except Exception:  # noqa: BLE001
+        return None
+    return database
 
 
-def compile_rule_levels(rule_levels: Iterable[RuleLevel]) -> list[CompiledLevel]:
+def _seq_has_group_refs(seq) -> bool:  # type: ignore[no-untyped-def]
+    for op, av in seq:
+        if op is sre_constants.GROUPREF or op is sre_constants.GROUPREF_EXISTS:
+            return True
+        for sub in av if isinstance(av, (tuple, list)) else (av,):
+            branches = sub if isinstance(sub, list) else (sub,)
+            if any(isinstance(branch, sre_parse.SubPattern) and _seq_has_group_refs(branch) for branch in branches):
+                return True
+    return False
+
+
+def _rule_has_group_refs(regex: re.Pattern[str]) -> bool:
+    try:
+        return _seq_has_group_refs(sre_parse.parse(regex.pattern, regex.flags))
+    except re.error:
+        return True
+
+
+def _combine_rules(dispatch: list[tuple[CompiledLevel, CompiledRule]]) -> re.Pattern[str] | None:
+    if not dispatch:
+        return None
+    if any(_rule_has_group_refs(rule.regex) for _, rule in dispatch):
+        # 合并后分组编号整体偏移，数字反向引用与条件分组会指向其他规则的分组
+        return None
+    pattern = "|".join(f"(?P<r{idx}>{rule.regex.pattern})" for idx, (_, rule) in enumerate(dispatch))
+    try:
+        return re.compile(pattern)
+    except re.error:
+        # 规则间存在重名分组或全局标志时无法合并，退回逐条匹配
+        return None
+
+
+def validate_rule_line(rule_line: str) -> None:
+    # 规则格式错误时抛出 ValueError，正则或替换模板无效时抛出 re.error
+    _compile_rule(rule_line.strip())
+
+
+def compile_rule_levels(rule_levels: Iterable[RuleLevel]) -> CompiledRuleSet:
     compiled: list[CompiledLevel] = []
     for index, level in enumerate(rule_levels, start=1):
         level_name = normalize_title(level.name, f"L{index}")
@@ -93,71 +341,166 @@ def compile_rule_levels(rule_levels: Iterable[RuleLevel]) -> list[CompiledLevel]
                 continue
             rules.append(_compile_rule(line))
         if rules:
-            compiled.append(CompiledLevel(level_no=index, level_name=level_name, rules=rules))
-    return compiled
-
-
-def detect_heading_level(line: str, compiled_levels: list[CompiledLevel]) -> MatchResult | None:
-    text = line.strip()
+            first_chars = _union_first_chars(_rule_first_chars(rule.regex) for rule in rules)
+            compiled.append(CompiledLevel(level_no=index, level_name=level_name, rules=rules, first_chars=first_chars))
+    dispatch = [(level, rule) for level in compiled for rule in level.rules]
+    first_chars = _union_first_chars(level.first_chars for level in compiled)
+    literal_prefixes = _collect_literal_prefixes(rule for _, rule in dispatch)
+    scan = _build_scan_pattern(first_chars, literal_prefixes)
+    return CompiledRuleSet(
+        levels=compiled,
+        combined=_combine_rules(dispatch),
+        dispatch=dispatch,
+        first_chars=first_chars,
+        literal_prefixes=literal_prefixes,
+        scan=scan,
+        hs_database=_build_hs_database(scan),
+    )
+
+
+_DEFAULT_COMPILED = compile_rule_levels(default_rule_levels())
+
+# 行首缩进/行尾空白的容差，超过 max_len + 该值的原始行无需 strip 即可判定过长
+_INDENT_SLACK = 8
+
+
+def _render_match(level: CompiledLevel, rule: CompiledRule, match: re.Match[str], text: str) -> MatchResult:
+    rendered = rule.expand(match).strip()
+    rendered = normalize_title(rendered, text)
+    return MatchResult(
+        level_no=level.level_no,
+        level_name=level.level_name,
+        rule=rule,
+        matched_text=text,
+        rendered_title=rendered,
+    )
+
+
+def detect_heading_level(text: str, compiled: CompiledRuleSet) -> MatchResult | None:
+    # text 需已去除首尾空白，由 check_line_for_toc 统一处理
     if not text:
         return None
-    for level in compiled_levels:
+    if compiled.combined is not None:
+        hit = compiled.combined.match(text)
+        if hit is None or hit.lastgroup is None:
+            return None
+        level, rule = compiled.dispatch[int(hit.lastgroup[1:])]
+        match = rule.regex.match(text)
+        if match is not None:
+            return _render_match(level, rule, match, text)
+    for level in compiled.levels:
         for rule in level.rules:
-            match = rule.regex.search(text)
-            if not match:
-                continue
-            rendered = match.expand(rule.replacement).strip()
-            rendered = normalize_title(rendered, text)
-            return MatchResult(
-                level_no=level.level_no,
-                level_name=level.level_name,
-                rule=rule,
-                matched_text=text,
-                rendered_title=rendered,
-            )
+            match = rule.regex.match(text)
+            if match:
+                return _render_match(level, rule, match, text)
     return None
 
 
-def check_line_for_toc(line: str, compiled_levels: list[CompiledLevel], max_len: int = 180) -> LineCheckResult:
+def check_line_for_toc(line: str, compiled: CompiledRuleSet, max_len: int = 180) -> LineCheckResult:
+    if len(line) > max_len + _INDENT_SLACK:
+        return LineCheckResult(matched=None, accepted=False, reason=f"超过最大长度 {max_len}")
     text = line.strip()
     if not text:
         return LineCheckResult(matched=None, accepted=False, reason="空行")
     if len(text) > max_len:
         return LineCheckResult(matched=None, accepted=False, reason=f"超过最大长度 {max_len}")
-    matched = detect_heading_level(text, compiled_levels)
+    if compiled.first_chars is not None and text[0] not in compiled.first_chars:
+        return LineCheckResult(matched=None, accepted=False, reason="未命中规则")
+    if compiled.literal_prefixes and not text.startswith(compiled.literal_prefixes):
+        return LineCheckResult(matched=None, accepted=False, reason="未命中规则")
+    matched = detect_heading_level(text, compiled)
     if matched is None:
         return LineCheckResult(matched=None, accepted=False, reason="未命中规则")
     return LineCheckResult(matched=matched, accepted=True, reason="命中规则")
 
 
-def _next_greater_start(items: list[TocItem], start_line: int) -> int | None:
-    greater = [item.start_line for item in items if item.start_line > start_line]
-    return min(greater) if greater else None
-
-
 def recompute_ranges(items: list[TocItem], total_lines: int) -> list[TocItem]:
     if not items:
         return []
     sorted_items = sorted(items, key=lambda item: (item.start_line, item.level))
-    for item in sorted_items:
-        nxt = _next_greater_start(sorted_items, item.start_line)
-        item.end_line = (nxt - 1) if nxt is not None else (total_lines - 1)
-        if item.end_line < item.start_line:
-            item.end_line = item.start_line
+    starts = [item.start_line for item in sorted_items]
+    next_start = total_lines
+    for idx in range(len(starts) - 1, -1, -1):
+        start = starts[idx]
+        if idx + 1 < len(starts) and starts[idx + 1] > start:
+            next_start = starts[idx + 1]
+        sorted_items[idx].end_line = max(start, next_start - 1)
     return sorted_items
 
 
-def parse_toc_items(lines: list[str], rule_levels: Iterable[RuleLevel] | None = None) -> list[TocItem]:
+def recompute_ranges_after_insert(sorted_items: list[TocItem], inserted_idx: int, total_lines: int) -> None:
+    inserted = sorted_items[inserted_idx]
+    next_start = next(
+        (
+            sorted_items[idx].start_line
+            for idx in range(inserted_idx + 1, len(sorted_items))
+            if sorted_items[idx].start_line > inserted.start_line
+        ),
+        None,
+    )
+    inserted.end_line = max(inserted.start_line, (next_start - 1) if next_start is not None else (total_lines - 1))
+
+    prev_idx = inserted_idx - 1
+    while prev_idx >= 0 and sorted_items[prev_idx].start_line == inserted.start_line:
+        prev_idx -= 1
+    if prev_idx < 0:
+        return
+    prev_start = sorted_items[prev_idx].start_line
+    while prev_idx >= 0 and sorted_items[prev_idx].start_line == prev_start:
+        sorted_items[prev_idx].end_line = max(prev_start, inserted.start_line - 1)
+        prev_idx -= 1
+
+
+def _hs_candidate_line_indexes(lines: list[str], database: Any) -> Iterator[int]:
+    data = "\n".join(lines).encode("utf-8")
+    match_ends: list[int] = []
+
+    def on_match(_pattern_id: int, _start: int, end: int, _flags: int, _context: object) -> None:
+        match_ends.append(end)
+
+    database.scan(data, match_event_handler=on_match)
+    line_no = 0
+    offset = 0
+    last_line = -1
+    for end in match_ends:
+        line_no += data.count(b"\n", offset, end)
+        offset = end
+        if line_no != last_line:
+            last_line = line_no
+            yield line_no
+
+
+def _candidate_line_indexes(lines: list[str], compiled: CompiledRuleSet) -> Iterator[int]:
+    if compiled.scan is None:
+        yield from range(len(lines))
+        return
+    if compiled.hs_database is not None:
+        yield from _hs_candidate_line_indexes(lines, compiled.hs_database)
+        return
+    joined = "\n".join(lines)
+    line_no = 0
+    offset = 0
+    for hit in compiled.scan.finditer(joined):
+        line_no += joined.count("\n", offset, hit.start())
+        offset = hit.start()
+        yield line_no
+
+
+def parse_toc_items(
+    lines: list[str],
+    rule_levels: Iterable[RuleLevel] | None = None,
+    compiled_levels: CompiledRuleSet | None = None,
+) -> list[TocItem]:
     if not lines:
         return []
-    levels = list(rule_levels or default_rule_levels())
-    compiled_levels = compile_rule_levels(levels)
-    if not compiled_levels:
+    if compiled_levels is None:
+        compiled_levels = compile_rule_levels(rule_levels) if rule_levels is not None else _DEFAULT_COMPILED
+    if not compiled_levels.levels:
         return [TocItem(title="正文", start_line=0, end_line=len(lines) - 1, level=1, level_name="章节")]
 
     detected: list[TocItem] = []
-    for idx, line in enumerate(lines):
-        checked = check_line_for_toc(line, compiled_levels)
+    for idx in _candidate_line_indexes(lines, compiled_levels):
+        checked = check_line_for_toc(lines[idx], compiled_levels)
         if not checked.accepted or checked.matched is None:
             continue
         detected.append(
@@ -171,7 +514,7 @@ def parse_toc_items(lines: list[str], rule_levels: Iterable[RuleLevel] | None =
         )
 
     if not detected:
-        deepest = compiled_levels[-1]
+        deepest = compiled_levels.levels[-1]
         return [
             TocItem(
                 title="正文",
@@ -1,46 +1,98 @@
 from __future__ import annotations
 
+import codecs
 from pathlib import Path
-from typing import Callable
-
-import chardet
+from typing import Callable, Iterator
 
 
 ProgressCallback = Callable[[int], None]
 
-
-def detect_encoding(file_path: str) -> str:
-    path = Path(file_path)
-    with path.open("rb") as fh:
-        sample = fh.read(1024 * 1024)
-    if not sample:
-        raise ValueError("文件为空")
-
-    result = chardet.detect(sample)
-    encoding = (result.get("encoding") or "").lower()
-    confidence = float(result.get("confidence") or 0.0)
-
+SAMPLE_SIZE = 16 * 1024
+RETRY_SAMPLE_SIZE = 1024 * 1024
+
+_BOM_ENCODINGS = (
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+
+def _guess_encoding(sample: bytes) -> tuple[str, float]:
+    # 检测库仅在 BOM/UTF-8/GBK 快速判定均失败时才需要，延迟导入
+    try:
+        import cchardet
+    except ImportError:  # 可选依赖，未安装时使用 charset-normalizer
+        cchardet = None
+    # 定长样本末尾常截断多字节字符，会让检测库整体判定失败，先退回到最后一个换行
+    cut = sample.rfind(b"\n")
+    if cut > 0:
+        sample = sample[: cut + 1]
+    if cchardet is not None:
+        result = cchardet.detect(sample)
+        return (result.get("encoding") or "").lower(), float(result.get("confidence") or 0.0)
+    from charset_normalizer import from_bytes
+
+    best = from_bytes(sample).best()
+    if best is None:
+        return "", 0.0
+    return best.encoding.lower(), 1.0
+
+
+def _decodes(sample: bytes, encoding: str) -> bool:
+    try:
+        codecs.getincrementaldecoder(encoding)(errors="strict").decode(sample, final=False)
+    except (UnicodeDecodeError, LookupError):
+        return False
+    return True
+
+
+def _guess_candidate(sample: bytes) -> str | None:
+    encoding, confidence = _guess_encoding(sample)
     if "utf" in encoding:
         return "utf-8-sig"
     if "gb" in encoding or "cp936" in encoding:
         return "gbk"
     if confidence >= 0.5 and encoding:
         return encoding
+    return None
+
 
+def detect_encoding(file_path: str) -> str:
+    path = Path(file_path)
+    with path.open("rb") as fh:
+        sample = fh.read(SAMPLE_SIZE)
+        if not sample:
+            raise ValueError("文件为空")
+        for bom, bom_encoding in _BOM_ENCODINGS:
+            if sample.startswith(bom):
+                return bom_encoding
+        if sample.isascii() and len(sample) == SAMPLE_SIZE:
+            # 纯 ASCII 样本既能按 UTF-8 也能按 GBK 解码，无法区分，扩大样本再判断
+            sample += fh.read(RETRY_SAMPLE_SIZE - SAMPLE_SIZE)
+        if _decodes(sample, "utf-8"):
+            return "utf-8-sig"
+        # GBK 的字节范围几乎覆盖其他双字节编码（Shift-JIS、EUC-KR 等），能解码不代表就是 GBK，交给检测库判断
+        candidate = _guess_candidate(sample)
+        if (candidate is None or not _decodes(sample, candidate)) and len(sample) == SAMPLE_SIZE:
+            sample += fh.read(RETRY_SAMPLE_SIZE - SAMPLE_SIZE)
+            candidate = _guess_candidate(sample)
+
+    if candidate is not None and _decodes(sample, candidate):
+        return candidate
     for fallback in ("utf-8-sig", "gbk"):
-        try:
-            sample.decode(fallback)
+        if _decodes(sample, fallback):
             return fallback
-        except UnicodeDecodeError:
-            continue
     raise ValueError("无法识别文件编码（仅支持 UTF-8/GBK）")
 
 
-def load_txt_lines(
+def iter_txt_line_blocks(
     file_path: str,
     progress_callback: ProgressCallback | None = None,
     chunk_size: int = 64 * 1024,
-) -> list[str]:
+    block_lines: int = 8192,
+) -> Iterator[list[str]]:
     path = Path(file_path)
     if not path.exists():
         raise FileNotFoundError(file_path)
@@ -50,34 +102,54 @@ def load_txt_lines(
         raise ValueError("TXT 文件为空")
 
     encoding = detect_encoding(file_path)
-    chunks: list[bytes] = []
-    read_size = 0
+    carry = ""
+    started = False
+    blank_tail: list[str] = []
+    block: list[str] = []
 
-    with path.open("rb") as fh:
+    # newline=None 由 TextIOWrapper 在 C 层把 \r\n / \r 统一为 \n，包括跨块的 \r\n
+    with path.open("r", encoding=encoding, errors="strict", newline=None) as fh:
         while True:
-            block = fh.read(chunk_size)
-            if not block:
+            chunk = fh.read(chunk_size)
+            final = not chunk
+            parts = (carry + chunk.replace("\ufeff", "")).split("\n")
+            carry = "" if final else parts.pop()
+
+            for line in parts:
+                if not line.strip():
+                    if started:
+                        blank_tail.append(line)
+                    continue
+                started = True
+                if blank_tail:
+                    block.extend(blank_tail)
+                    blank_tail = []
+                block.append(line)
+                if len(block) >= block_lines:
+                    yield block
+                    block = []
+
+            if final:
                 break
-            chunks.append(block)
-            read_size += len(block)
             if progress_callback:
-                progress = min(99, int(read_size * 100 / file_size))
+                progress = min(99, int(fh.buffer.tell() * 100 / file_size))
                 progress_callback(progress)
 
-    raw_data = b"".join(chunks)
-    text = raw_data.decode(encoding, errors="strict")
-    text = text.replace("\r\n", "\n").replace("\r", "\n").replace("\ufeff", "")
-    lines = text.split("\n")
-
-    while lines and not lines[0].strip():
-        lines.pop(0)
-    while lines and not lines[-1].strip():
-        lines.pop()
-
-    if not lines:
+    if block:
+        yield block
+    if not started:
         raise ValueError("TXT 文件为空")
 
     if progress_callback:
         progress_callback(100)
-    return lines
 
+
+def load_txt_lines(
+    file_path: str,
+    progress_callback: ProgressCallback | None = None,
+    chunk_size: int = 64 * 1024,
+) -> list[str]:
+    lines: list[str] = []
+    for block in iter_txt_line_blocks(file_path, progress_callback=progress_callback, chunk_size=chunk_size):
+        lines.extend(block)
+    return lines
@@ -20,7 +20,9 @@ from app.core.models import EpubMetadata
 
 
 def estimate_pages(lines: list[str]) -> int:
-    total_chars = sum(len(line.strip()) for line in lines if line.strip())
+    total_chars = 0
+    for line in lines:
+        total_chars += len(line.strip())
     if total_chars <= 0:
         return 1
     return max(1, (total_chars + 799) // 800)
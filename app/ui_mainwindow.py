@@ -2,8 +2,8 @@ from __future__ import annotations
 
 from enum import Enum
 
-from PySide6.QtCore import Qt, Signal
-from PySide6.QtGui import QCloseEvent, QDragEnterEvent, QDropEvent, QKeyEvent
+from PySide6.QtCore import QRect, QSize, Qt, Signal
+from PySide6.QtGui import QCloseEvent, QColor, QDragEnterEvent, QDropEvent, QKeyEvent, QPainter, QPaintEvent, QResizeEvent
 from PySide6.QtWidgets import (
     QFrame,
     QGroupBox,
@@ -30,6 +30,67 @@ class AppState(Enum):
     EDITING = 3
 
 
+class LineNumberArea(QWidget):
+    def __init__(self, editor: PreviewTextEdit) -> None:
+        super().__init__(editor)
+        self.editor = editor
+
+    def sizeHint(self) -> QSize:  # noqa: N802
+        return QSize(self.editor.line_number_area_width(), 0)
+
+    def paintEvent(self, event: QPaintEvent) -> None:  # noqa: N802
+        self.editor.paint_line_numbers(event)
+
+
+class PreviewTextEdit(QPlainTextEdit):
+    def __init__(self) -> None:
+        super().__init__()
+        self.line_number_area = LineNumberArea(self)
+        self.blockCountChanged.connect(self._update_line_number_area_width)
+        self.updateRequest.connect(self._update_line_number_area)
+        self._update_line_number_area_width()
+
+    def line_number_area_width(self) -> int:
+        digits = max(6, len(str(self.blockCount())))
+        return 10 + self.fontMetrics().horizontalAdvance("9") * digits
+
+    def _update_line_number_area_width(self, _count: int = 0) -> None:
+        self.setViewportMargins(self.line_number_area_width(), 0, 0, 0)
+
+    def _update_line_number_area(self, rect: QRect, dy: int) -> None:
+        if dy:
+            self.line_number_area.scroll(0, dy)
+        else:
+            self.line_number_area.update(0, rect.y(), self.line_number_area.width(), rect.height())
+        if rect.contains(self.viewport().rect()):
+            self._update_line_number_area_width()
+
+    def resizeEvent(self, event: QResizeEvent) -> None:  # noqa: N802
+        super().resizeEvent(event)
+        rect = self.contentsRect()
+        self.line_number_area.setGeometry(QRect(rect.left(), rect.top(), self.line_number_area_width(), rect.height()))
+
+    def paint_line_numbers(self, event: QPaintEvent) -> None:
+        painter = QPainter(self.line_number_area)
+        painter.fillRect(event.rect(), QColor("#f0f0f0"))
+        painter.setPen(QColor("#7f8c8d"))
+
+        block = self.firstVisibleBlock()
+        block_no = block.blockNumber()
+        top = round(self.blockBoundingGeometry(block).translated(self.contentOffset()).top())
+        bottom = top + round(self.blockBoundingRect(block).height())
+        width = self.line_number_area.width() - 5
+        line_height = self.fontMetrics().height()
+        while block.isValid() and top <= event.rect().bottom():
+            if block.isVisible() and bottom >= event.rect().top():
+                painter.drawText(0, top, width, line_height, Qt.AlignmentFlag.AlignRight, f"{block_no + 1:06d}")
+            block = block.next()
+            top = bottom
+            bottom = top + round(self.blockBoundingRect(block).height())
+            block_no += 1
+        painter.end()
+
+
 class MainWindow(QMainWindow):
     txt_file_dropped = Signal(str)
     escape_pressed = Signal()
@@ -120,7 +181,7 @@ class MainWindow(QMainWindow):
         center_panel = QWidget()
         center_layout = QVBoxLayout(center_panel)
         center_layout.addWidget(QLabel("TXT 预览"))
-        self.preview_text = QPlainTextEdit()
+        self.preview_text = PreviewTextEdit()
         self.preview_text.setReadOnly(True)
         self.preview_text.setLineWrapMode(QPlainTextEdit.LineWrapMode.NoWrap)
         self.preview_text.setStyleSheet("font-family: Consolas, 'Courier New', monospace;")
@@ -162,7 +223,7 @@ class MainWindow(QMainWindow):
         name_row.addWidget(self.rule_level_name_edit)
         rule_layout.addLayout(name_row)
 
-        rule_layout.addWidget(QLabel("规则（每行：正则匹配 => 正则替换；替换遵循 Python re 语法，如 \\1 / \\g<1>）"))
+        rule_layout.addWidget(QLabel("规则（每行：正则匹配 => 正则替换；匹配固定从行首开始，替换遵循 Python re 语法，如 \\1 / \\g<1>）"))
         self.rule_text_edit = QPlainTextEdit()
         self.rule_text_edit.setPlaceholderText(
             "示例：\n"
@@ -206,14 +267,22 @@ class MainWindow(QMainWindow):
     def set_loading_file_name(self, file_name: str) -> None:
         self.loading_file_label.setText(f"文件名: {file_name}")
 
-    def add_toc_item(self, parent: QTreeWidgetItem | None, title: str, range_text: str, flat_index: int) -> QTreeWidgetItem:
+    def add_toc_item(
+        self,
+        parent: QTreeWidgetItem | None,
+        title: str,
+        range_text: str,
+        flat_index: int,
+        position: int | None = None,
+    ) -> QTreeWidgetItem:
         item = QTreeWidgetItem([title, range_text])
         item.setFlags(item.flags() | Qt.ItemFlag.ItemIsEditable)
         item.setData(0, Qt.ItemDataRole.UserRole, flat_index)
-        if parent is None:
-            self.toc_tree.addTopLevelItem(item)
+        container = parent if parent is not None else self.toc_tree.invisibleRootItem()
+        if position is None:
+            container.addChild(item)
         else:
-            parent.addChild(item)
+            container.insertChild(position, item)
         return item
 
     def dragEnterEvent(self, event: QDragEnterEvent) -> None:  # noqa: N802